@@ -0,0 +1,15 @@
+import os
+
+# Railway portu PORT değişkeniyle verir
+bind = f"0.0.0.0:{os.getenv('PORT', '8001')}"
+
+# cpu_count() container limitini değil host'u gösterir; affinity + üst sınır kullanılır.
+# Her worker kendi argon2 thread pool'unu açtığı için (hash başına ~46 MiB) sınır bellek için de gerekli.
+MAX_DEFAULT_WORKERS = 4
+available_cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+
+# Worker sayısı WEB_CONCURRENCY ile ezilebilir (küçük container'larda bellek için)
+workers = int(os.getenv("WEB_CONCURRENCY", min(available_cpus, MAX_DEFAULT_WORKERS)))
+worker_class = "uvicorn.workers.UvicornWorker"
+keepalive = 5
+timeout = 60
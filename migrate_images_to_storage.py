@@ -0,0 +1,48 @@
+"""Tek seferlik: satırlardaki base64 logo ve ürün görsellerini Supabase Storage'a taşır.
+
+Kullanım: python migrate_images_to_storage.py
+"""
+from supabase import create_client
+from server import (
+    SUPABASE_URL, SUPABASE_SERVICE_KEY, LOGO_BUCKET, PRODUCT_IMAGE_BUCKET,
+    decode_base64_image, image_path,
+)
+
+BATCH_SIZE = 50
+
+supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+
+def migrate(table: str, base64_column: str, url_column: str, owner_column: str, bucket: str):
+    migrated = 0
+    last_id = None
+    while True:
+        query = supabase.table(table).select(f"id, {owner_column}, {base64_column}").not_.is_(base64_column, "null").order("id").limit(BATCH_SIZE)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.execute().data
+        if not rows:
+            break
+        
+        for row in rows:
+            last_id = row["id"]
+            data = row[base64_column]
+            try:
+                if data.startswith(("http://", "https://")):
+                    url = data
+                else:
+                    content, content_type = decode_base64_image(data)
+                    path = image_path(row[owner_column], content_type)
+                    supabase.storage.from_(bucket).upload(path, content, {"content-type": content_type})
+                    url = supabase.storage.from_(bucket).get_public_url(path)
+            except Exception as e:
+                print(f"{table} {row['id']}: atlandı ({e})")
+                continue
+            
+            supabase.table(table).update({url_column: url, base64_column: None}).eq("id", row["id"]).execute()
+            migrated += 1
+    
+    print(f"{table}: {migrated} görsel taşındı")
+
+if __name__ == "__main__":
+    migrate("users", "company_logo", "logo_url", "id", LOGO_BUCKET)
+    migrate("products", "image_base64", "image_url", "user_id", PRODUCT_IMAGE_BUCKET)
@@ -1,17 +1,27 @@
 from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import Response
+from fastapi.responses import Response, ORJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, EmailStr, Field
+from starlette.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 from typing import Optional, List
 from datetime import datetime, timedelta
-from supabase import create_client, Client
+from supabase import acreate_client, AsyncClient
 import os
 import bcrypt
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
 import jwt
 import io
+import hashlib
+import orjson
+import time
+import asyncio
+import uuid
+from cachetools import TTLCache, LRUCache
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.units import mm
@@ -34,30 +44,85 @@ SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
 if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
     raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set in .env")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+# Async client her worker için startup'ta oluşturulur; HTTP bağlantıları havuzda tutulur
+supabase: Optional[AsyncClient] = None
 
 # JWT Settings
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
-app = FastAPI(title="Invoice & Quotation API with Supabase")
+# Kullanıcı satırından okunan kolonlar (password_hash ve base64 logo hariç)
+USER_COLUMNS = (
+    "id, email, full_name, company, phone, subscription_plan, subscription_status, logo_url, "
+    "company_address, company_tax_number, company_tax_office, default_tax_rate, design_settings, created_at"
+)
+
+# Kimliği doğrulanmış kullanıcı önbelleği (worker başına, 60 sn)
+_user_cache = TTLCache(maxsize=10_000, ttl=60)
+
+# Dashboard yanıtları için kısa süreli, worker'a özel önbellek.
+# Diğer gunicorn worker'ları değişikliği en geç TTL (30 sn) dolunca görür; bayatlık bu süreyle sınırlıdır.
+_dashboard_cache = TTLCache(maxsize=10_000, ttl=30)
+DASHBOARD_CACHE_NAMES = ("statistics", "payment_statistics", "categories", "quotation_stats")
+
+def invalidate_dashboard(user_id: str):
+    # Sadece isteği işleyen worker'ın önbelleğini temizler
+    for name in DASHBOARD_CACHE_NAMES:
+        _dashboard_cache.pop((user_id, name), None)
+
+def make_etag(data: bytes) -> str:
+    return f'"{hashlib.blake2b(data, digest_size=8).hexdigest()}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    return bool(if_none_match) and etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+def etag_response(request: Request, payload) -> Response:
+    # İçerik değişmediyse gövdesiz 304 döner
+    body = orjson.dumps(payload)
+    etag = make_etag(body)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# Doğrulanmış token payload'ları; süre dolumu her erişimde ayrıca kontrol edilir
+_token_cache = LRUCache(maxsize=10_000)
+
+app = FastAPI(title="Invoice & Quotation API with Supabase", default_response_class=ORJSONResponse)
 api_router = APIRouter(prefix="/api")
 security = HTTPBearer()
 
-# CORS
+@app.on_event("startup")
+async def init_supabase():
+    global supabase
+    supabase = await acreate_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+
+# CORS - credentials ile "*" kullanılamaz, izinli originler açıkça verilir
+CORS_ORIGINS = [origin.strip() for origin in os.getenv("CORS_ORIGINS", "https://bartesteklif.netlify.app").split(",") if origin.strip()]
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    max_age=86400,
 )
 
+# 1 KB üzeri yanıtları sıkıştır (büyük teklif listeleri)
+app.add_middleware(GZipMiddleware, minimum_size=1000, compresslevel=5)
+
 # ============================================================
 # PYDANTIC MODELS
 # ============================================================
 
+# İstek gövdeleri: bilinmeyen alanlar yok sayılır, metin alanları kırpılır
+class RequestModel(BaseModel):
+    model_config = ConfigDict(extra="ignore", str_strip_whitespace=True)
+
 class User(BaseModel):
     id: Optional[str] = None
     email: EmailStr
@@ -68,6 +133,7 @@ class User(BaseModel):
     subscription_status: str = "active"
     subscription_end_date: Optional[datetime] = None
     company_logo: Optional[str] = None
+    logo_url: Optional[str] = None
     company_address: Optional[str] = None
     company_tax_number: Optional[str] = None
     company_tax_office: Optional[str] = None
@@ -84,7 +150,7 @@ class UserLogin(BaseModel):
     email: EmailStr
     password: str
 
-class UserSettingsUpdate(BaseModel):
+class UserSettingsUpdate(RequestModel):
     full_name: Optional[str] = None
     company: Optional[str] = None
     phone: Optional[str] = None
@@ -107,7 +173,7 @@ class Customer(BaseModel):
     notes: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
-class CustomerCreate(BaseModel):
+class CustomerCreate(RequestModel):
     name: str
     email: Optional[str] = None
     phone: Optional[str] = None
@@ -127,10 +193,12 @@ class Product(BaseModel):
     unit: str = "adet"
     sku: Optional[str] = None
     specifications: Optional[str] = None
+    image_url: Optional[str] = None
+    # Eski istemciler için image_url'in kopyası
     image_base64: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
-class ProductCreate(BaseModel):
+class ProductCreate(RequestModel):
     name: str
     description: Optional[str] = None
     category: Optional[str] = None
@@ -141,7 +209,7 @@ class ProductCreate(BaseModel):
     specifications: Optional[str] = None
     image_base64: Optional[str] = None
 
-class QuotationItem(BaseModel):
+class QuotationItem(RequestModel):
     product_name: str
     specifications: Optional[str] = None
     quantity: int
@@ -167,7 +235,7 @@ class Quotation(BaseModel):
     items: List[QuotationItem] = []
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
-class QuotationCreate(BaseModel):
+class QuotationCreate(RequestModel):
     customer_id: str
     items: List[QuotationItem]
     discount_amount: float = 0
@@ -182,12 +250,12 @@ class Reminder(BaseModel):
     sent: bool = False
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
-class ReminderCreate(BaseModel):
+class ReminderCreate(RequestModel):
     quotation_id: str
     reminder_date: datetime
     message: str
 
-class PaymentUpdate(BaseModel):
+class PaymentUpdate(RequestModel):
     payment_status: str
     payment_date: Optional[datetime] = None
     payment_amount: Optional[float] = None
@@ -196,15 +264,42 @@ class PaymentUpdate(BaseModel):
 class CatalogCategories(BaseModel):
     categories: List[str]
 
+class CategoryCreate(RequestModel):
+    name: str = Field(min_length=1)
+
 # ============================================================
 # AUTH HELPERS
 # ============================================================
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+# Argon2id, OWASP önerilen parametreler (m=46 MiB, t=1, p=1)
+_password_hasher = PasswordHasher(time_cost=1, memory_cost=47104, parallelism=1)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+# Hash işlemleri CPU-yoğun; event loop'u bloklamaması için ayrı thread pool'da çalışır.
+# Eşzamanlı hash başına ~46 MiB ayrıldığından pool boyutu sınırlı tutulur.
+_password_pool = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1))
+
+def is_legacy_hash(hashed_password: str) -> bool:
+    return hashed_password.startswith("$2")
+
+def _verify_password_sync(plain_password: str, hashed_password: str) -> bool:
+    # Eski kullanıcıların bcrypt hash'leri
+    if is_legacy_hash(hashed_password):
+        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    try:
+        return _password_hasher.verify(hashed_password, plain_password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+async def hash_password(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_pool, _password_hasher.hash, password)
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_pool, _verify_password_sync, plain_password, hashed_password)
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    return is_legacy_hash(hashed_password) or _password_hasher.check_needs_rehash(hashed_password)
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -213,10 +308,22 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def decode_token(token: str) -> dict:
+    payload = _token_cache.get(token)
+    if payload is not None:
+        if payload.get("exp", 0) > time.time():
+            return payload
+        _token_cache.pop(token, None)
+        raise jwt.ExpiredSignatureError("Signature has expired")
+    
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    _token_cache[token] = payload
+    return payload
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         user_id: str = payload.get("user_id")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid authentication credentials")
@@ -225,13 +332,76 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except Exception:
         raise HTTPException(status_code=401, detail="Could not validate credentials")
     
+    cached_user = _user_cache.get(user_id)
+    if cached_user is not None:
+        return cached_user
+    
     # Kullanıcıyı Supabase'den çek
-    response = supabase.table("users").select("*").eq("id", user_id).execute()
+    response = await supabase.table("users").select(USER_COLUMNS).eq("id", user_id).execute()
     if not response.data:
         raise HTTPException(status_code=401, detail="User not found")
     
+    _user_cache[user_id] = response.data[0]
     return response.data[0]
 
+# ============================================================
+# IMAGE STORAGE
+# ============================================================
+
+# Logo ve ürün görselleri satırlarda base64 yerine Supabase Storage'da tutulur
+LOGO_BUCKET = "logos"
+PRODUCT_IMAGE_BUCKET = "product-images"
+
+# Public bucket'lara sadece bu görsel türleri yüklenir (HTML/SVG gibi içerikler barındırılmaz)
+IMAGE_EXTENSIONS = {"image/png": "png", "image/jpeg": "jpg", "image/webp": "webp", "image/gif": "gif"}
+
+def decode_base64_image(data: str) -> tuple[bytes, str]:
+    # "data:image/png;base64,..." veya düz base64; desteklenmeyen tür veya bozuk base64 ValueError verir
+    content_type = "image/png"
+    if data.startswith("data:"):
+        header, _, data = data.partition(",")
+        content_type = header[5:].split(";")[0].strip().lower() or content_type
+    if content_type not in IMAGE_EXTENSIONS:
+        raise ValueError(f"Unsupported image type: {content_type}")
+    return base64.b64decode(data), content_type
+
+def image_path(folder: str, content_type: str) -> str:
+    return f"{folder}/{uuid.uuid4().hex}.{IMAGE_EXTENSIONS[content_type]}"
+
+async def store_image(bucket: str, folder: str, data: Optional[str]) -> Optional[str]:
+    if not data:
+        return None
+    if data.startswith(("http://", "https://")):
+        return data
+    
+    # Büyük base64 gövdeleri event loop dışında çözülür
+    try:
+        content, content_type = await asyncio.to_thread(decode_base64_image, data)
+    except ValueError as e:
+        # binascii.Error da ValueError'dan türer
+        raise HTTPException(status_code=400, detail=f"Invalid image: {e}")
+    path = image_path(folder, content_type)
+    storage = supabase.storage.from_(bucket)
+    await storage.upload(path, content, {"content-type": content_type})
+    return await storage.get_public_url(path)
+
+def storage_object_path(bucket: str, url: Optional[str]) -> Optional[str]:
+    # Sadece bu bucket'a ait public URL'lerden nesne yolu çıkarılır
+    marker = f"/storage/v1/object/public/{bucket}/"
+    if not url or marker not in url:
+        return None
+    return url.split(marker, 1)[1].split("?", 1)[0]
+
+async def remove_image(bucket: str, url: Optional[str]):
+    path = storage_object_path(bucket, url)
+    if path is None:
+        return
+    try:
+        await supabase.storage.from_(bucket).remove([path])
+    except Exception:
+        # Silinemeyen eski görsel isteği bozmaz, sadece Storage'da artık kalır
+        pass
+
 # ============================================================
 # AUTH ENDPOINTS
 # ============================================================
@@ -239,12 +409,12 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
 @api_router.post("/auth/register")
 async def register(user: UserCreate):
     # Email kontrolü
-    existing = supabase.table("users").select("id").eq("email", user.email).execute()
+    existing = await supabase.table("users").select("id").eq("email", user.email).execute()
     if existing.data:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Yeni kullanıcı oluştur
-    hashed_pw = hash_password(user.password)
+    hashed_pw = await hash_password(user.password)
     new_user = {
         "email": user.email,
         "password_hash": hashed_pw,
@@ -254,7 +424,7 @@ async def register(user: UserCreate):
         "default_tax_rate": 20
     }
     
-    response = supabase.table("users").insert(new_user).execute()
+    response = await supabase.table("users").insert(new_user).execute()
     if not response.data:
         raise HTTPException(status_code=500, detail="Failed to create user")
     
@@ -274,16 +444,22 @@ async def register(user: UserCreate):
 @api_router.post("/auth/login")
 async def login(credentials: UserLogin):
     # Kullanıcıyı bul
-    response = supabase.table("users").select("*").eq("email", credentials.email).execute()
+    response = await supabase.table("users").select("id, email, full_name, password_hash").eq("email", credentials.email).execute()
     if not response.data:
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
     user = response.data[0]
     
     # Şifre kontrolü
-    if not verify_password(credentials.password, user["password_hash"]):
+    if not await verify_password(credentials.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
+    # Eski bcrypt hash'lerini giriş sırasında argon2'ye yükselt
+    if password_needs_rehash(user["password_hash"]):
+        new_hash = await hash_password(credentials.password)
+        await supabase.table("users").update({"password_hash": new_hash}).eq("id", user["id"]).execute()
+        _user_cache.pop(user["id"], None)
+    
     token = create_access_token({"user_id": user["id"]})
     
     return {
@@ -306,7 +482,8 @@ async def get_me(current_user: dict = Depends(get_current_user)):
         phone=current_user.get("phone"),
         subscription_plan=current_user.get("subscription_plan", "free"),
         subscription_status=current_user.get("subscription_status", "active"),
-        company_logo=current_user.get("company_logo"),
+        company_logo=current_user.get("logo_url"),
+        logo_url=current_user.get("logo_url"),
         company_address=current_user.get("company_address"),
         company_tax_number=current_user.get("company_tax_number"),
         company_tax_office=current_user.get("company_tax_office"),
@@ -317,35 +494,25 @@ async def get_me(current_user: dict = Depends(get_current_user)):
 
 @api_router.put("/auth/settings", response_model=User)
 async def update_settings(settings: UserSettingsUpdate, current_user: dict = Depends(get_current_user)):
-    update_data = {}
-    
-    if settings.full_name is not None:
-        update_data["full_name"] = settings.full_name
-    if settings.company is not None:
-        update_data["company"] = settings.company
-    if settings.phone is not None:
-        update_data["phone"] = settings.phone
-    if settings.company_logo is not None:
-        update_data["company_logo"] = settings.company_logo
-    if settings.company_address is not None:
-        update_data["company_address"] = settings.company_address
-    if settings.company_tax_number is not None:
-        update_data["company_tax_number"] = settings.company_tax_number
-    if settings.company_tax_office is not None:
-        update_data["company_tax_office"] = settings.company_tax_office
-    if settings.default_tax_rate is not None:
-        update_data["default_tax_rate"] = settings.default_tax_rate
-    if settings.design_settings is not None:
-        update_data["design_settings"] = settings.design_settings
+    # Sadece istemcinin gönderdiği, boş olmayan alanlar güncellenir
+    update_data = settings.model_dump(exclude_unset=True, exclude_none=True)
     
     if not update_data:
         raise HTTPException(status_code=400, detail="No data to update")
     
-    response = supabase.table("users").update(update_data).eq("id", current_user["id"]).execute()
+    # Logo Storage'a yüklenir, satırda sadece URL kalır
+    if "company_logo" in update_data:
+        update_data["logo_url"] = await store_image(LOGO_BUCKET, current_user["id"], update_data["company_logo"])
+        update_data["company_logo"] = None
+    
+    response = await supabase.table("users").update(update_data).eq("id", current_user["id"]).execute()
     if not response.data:
         raise HTTPException(status_code=500, detail="Failed to update settings")
     
     updated_user = response.data[0]
+    _user_cache.pop(current_user["id"], None)
+    if "logo_url" in update_data and update_data["logo_url"] != current_user.get("logo_url"):
+        await remove_image(LOGO_BUCKET, current_user.get("logo_url"))
     return User(
         id=updated_user["id"],
         email=updated_user["email"],
@@ -354,7 +521,8 @@ async def update_settings(settings: UserSettingsUpdate, current_user: dict = Dep
         phone=updated_user.get("phone"),
         subscription_plan=updated_user.get("subscription_plan", "free"),
         subscription_status=updated_user.get("subscription_status", "active"),
-        company_logo=updated_user.get("company_logo"),
+        company_logo=updated_user.get("logo_url"),
+        logo_url=updated_user.get("logo_url"),
         company_address=updated_user.get("company_address"),
         company_tax_number=updated_user.get("company_tax_number"),
         company_tax_office=updated_user.get("company_tax_office"),
@@ -367,376 +535,381 @@ async def update_settings(settings: UserSettingsUpdate, current_user: dict = Dep
 # CUSTOMER ENDPOINTS
 # ============================================================
 
+CUSTOMER_COLUMNS = "id, name, email, phone, company, address, tax_number, tax_office, notes, created_at"
+
 @api_router.get("/customers")
 async def get_customers(current_user: dict = Depends(get_current_user)):
-    response = supabase.table("customers").select("*").eq("user_id", current_user["id"]).execute()
+    response = await supabase.table("customers").select(CUSTOMER_COLUMNS).eq("user_id", current_user["id"]).execute()
     return response.data
 
 @api_router.post("/customers")
 async def create_customer(customer: CustomerCreate, current_user: dict = Depends(get_current_user)):
     new_customer = {
         "user_id": current_user["id"],
-        **customer.dict()
+        **customer.model_dump()
     }
-    response = supabase.table("customers").insert(new_customer).execute()
+    response = await supabase.table("customers").insert(new_customer).execute()
     if not response.data:
         raise HTTPException(status_code=500, detail="Failed to create customer")
+    invalidate_dashboard(current_user["id"])
     return response.data[0]
 
 @api_router.get("/customers/{customer_id}")
 async def get_customer(customer_id: str, current_user: dict = Depends(get_current_user)):
-    response = supabase.table("customers").select("*").eq("id", customer_id).eq("user_id", current_user["id"]).execute()
+    response = await supabase.table("customers").select(CUSTOMER_COLUMNS).eq("id", customer_id).eq("user_id", current_user["id"]).execute()
     if not response.data:
         raise HTTPException(status_code=404, detail="Customer not found")
     return response.data[0]
 
 @api_router.put("/customers/{customer_id}")
 async def update_customer(customer_id: str, customer: CustomerCreate, current_user: dict = Depends(get_current_user)):
-    response = supabase.table("customers").update(customer.dict(exclude_unset=True)).eq("id", customer_id).eq("user_id", current_user["id"]).execute()
+    response = await supabase.table("customers").update(customer.model_dump(exclude_unset=True)).eq("id", customer_id).eq("user_id", current_user["id"]).execute()
     if not response.data:
         raise HTTPException(status_code=404, detail="Customer not found")
     return response.data[0]
 
 @api_router.delete("/customers/{customer_id}")
 async def delete_customer(customer_id: str, current_user: dict = Depends(get_current_user)):
-    response = supabase.table("customers").delete().eq("id", customer_id).eq("user_id", current_user["id"]).execute()
+    response = await supabase.table("customers").delete().eq("id", customer_id).eq("user_id", current_user["id"]).execute()
     if not response.data:
         raise HTTPException(status_code=404, detail="Customer not found")
+    invalidate_dashboard(current_user["id"])
     return {"message": "Customer deleted successfully"}
 
 # ============================================================
 # PRODUCT ENDPOINTS
 # ============================================================
 
+# image_base64 anahtarı frontend image_url'e geçene kadar URL'i taşır
+PRODUCT_COLUMNS = (
+    "id, name, description, category, price, stock, unit, sku, specifications, image_url, "
+    "image_base64:image_url, created_at"
+)
+
+def product_response(row: dict) -> dict:
+    # insert/update dönüşü tüm kolonları içerir; image_base64 burada da URL'e eşitlenir
+    row["image_base64"] = row.get("image_url")
+    return row
+
 @api_router.get("/products")
 async def get_products(current_user: dict = Depends(get_current_user)):
-    response = supabase.table("products").select("*").eq("user_id", current_user["id"]).execute()
+    response = await supabase.table("products").select(PRODUCT_COLUMNS).eq("user_id", current_user["id"]).execute()
     return response.data
 
 @api_router.post("/products")
 async def create_product(product: ProductCreate, current_user: dict = Depends(get_current_user)):
     new_product = {
         "user_id": current_user["id"],
-        **product.dict()
+        **product.model_dump()
     }
-    response = supabase.table("products").insert(new_product).execute()
+    # Görsel Storage'a yüklenir, satırda sadece URL kalır
+    new_product["image_url"] = await store_image(PRODUCT_IMAGE_BUCKET, current_user["id"], new_product.pop("image_base64", None))
+    response = await supabase.table("products").insert(new_product).execute()
     if not response.data:
         raise HTTPException(status_code=500, detail="Failed to create product")
-    return response.data[0]
+    invalidate_dashboard(current_user["id"])
+    return product_response(response.data[0])
 
 @api_router.get("/products/{product_id}")
 async def get_product(product_id: str, current_user: dict = Depends(get_current_user)):
-    response = supabase.table("products").select("*").eq("id", product_id).eq("user_id", current_user["id"]).execute()
+    response = await supabase.table("products").select(PRODUCT_COLUMNS).eq("id", product_id).eq("user_id", current_user["id"]).execute()
     if not response.data:
         raise HTTPException(status_code=404, detail="Product not found")
     return response.data[0]
 
 @api_router.put("/products/{product_id}")
 async def update_product(product_id: str, product: ProductCreate, current_user: dict = Depends(get_current_user)):
-    response = supabase.table("products").update(product.dict(exclude_unset=True)).eq("id", product_id).eq("user_id", current_user["id"]).execute()
+    update_data = product.model_dump(exclude_unset=True)
+    old_image_url = None
+    if "image_base64" in update_data:
+        # Değiştirilen görsel güncellemeden sonra Storage'dan silinir
+        existing = await supabase.table("products").select("image_url").eq("id", product_id).eq("user_id", current_user["id"]).execute()
+        if not existing.data:
+            raise HTTPException(status_code=404, detail="Product not found")
+        old_image_url = existing.data[0].get("image_url")
+        update_data["image_url"] = await store_image(PRODUCT_IMAGE_BUCKET, current_user["id"], update_data["image_base64"])
+        update_data["image_base64"] = None
+    
+    response = await supabase.table("products").update(update_data).eq("id", product_id).eq("user_id", current_user["id"]).execute()
     if not response.data:
         raise HTTPException(status_code=404, detail="Product not found")
-    return response.data[0]
+    invalidate_dashboard(current_user["id"])
+    if old_image_url and old_image_url != update_data["image_url"]:
+        await remove_image(PRODUCT_IMAGE_BUCKET, old_image_url)
+    return product_response(response.data[0])
 
 @api_router.delete("/products/{product_id}")
 async def delete_product(product_id: str, current_user: dict = Depends(get_current_user)):
-    response = supabase.table("products").delete().eq("id", product_id).eq("user_id", current_user["id"]).execute()
+    response = await supabase.table("products").delete().eq("id", product_id).eq("user_id", current_user["id"]).execute()
     if not response.data:
         raise HTTPException(status_code=404, detail="Product not found")
+    invalidate_dashboard(current_user["id"])
+    await remove_image(PRODUCT_IMAGE_BUCKET, response.data[0].get("image_url"))
     return {"message": "Product deleted successfully"}
 
 # ============================================================
 # QUOTATION ENDPOINTS
 # ============================================================
 
-def generate_quotation_number() -> str:
-    from datetime import datetime
-    import random
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    random_num = random.randint(1000, 9999)
-    return f"Q-{timestamp}-{random_num}"
+QUOTATION_COLUMNS = (
+    "id, customer_id, quotation_number, subtotal, discount_amount, tax_rate, tax_amount, total, notes, "
+    "status, payment_status, payment_date, payment_amount, payment_notes, created_at, updated_at"
+)
+QUOTATION_ITEM_COLUMNS = "id, product_name, specifications, quantity, unit, unit_price, total"
+
+# Teklif, müşteri ve kalemler tek sorguda; embed alias'ları API alan adlarını verir
+QUOTATION_SELECT = f"{QUOTATION_COLUMNS}, customer:customers({CUSTOMER_COLUMNS}), items:quotation_items({QUOTATION_ITEM_COLUMNS})"
 
 @api_router.get("/quotations")
 async def get_quotations(current_user: dict = Depends(get_current_user)):
-    # Quotations with customer data
-    response = supabase.table("quotations").select("*, customers(*)").eq("user_id", current_user["id"]).order("created_at", desc=True).execute()
-    
-    quotations = []
-    for quot in response.data:
-        # Items çek
-        items_response = supabase.table("quotation_items").select("*").eq("quotation_id", quot["id"]).execute()
-        quot["items"] = items_response.data
-        quot["customer"] = quot.pop("customers", {})
-        quotations.append(quot)
-    
-    return quotations
+    # Quotations with customer data and items
+    response = await supabase.table("quotations").select(QUOTATION_SELECT).eq("user_id", current_user["id"]).order("created_at", desc=True).execute()
+    return response.data
 
 @api_router.post("/quotations")
 async def create_quotation(quotation: QuotationCreate, current_user: dict = Depends(get_current_user)):
-    # Hesaplamalar
-    subtotal = sum(item.total for item in quotation.items)
-    taxable_amount = subtotal - quotation.discount_amount
-    tax_amount = taxable_amount * (quotation.tax_rate / 100)
-    total = taxable_amount + tax_amount
-    
-    # Quotation oluştur
-    new_quotation = {
-        "user_id": current_user["id"],
-        "customer_id": quotation.customer_id,
-        "quotation_number": generate_quotation_number(),
-        "subtotal": subtotal,
-        "discount_amount": quotation.discount_amount,
-        "tax_rate": quotation.tax_rate,
-        "tax_amount": tax_amount,
-        "total": total,
-        "notes": quotation.notes,
-        "status": "pending",
-        "payment_status": "unpaid"
-    }
-    
-    quot_response = supabase.table("quotations").insert(new_quotation).execute()
-    if not quot_response.data:
+    # Quotation ve itemlar tek transaction'da oluşur; numara ve toplamlar DB'de hesaplanır
+    response = await supabase.rpc("create_quotation_with_items", {
+        "p_user_id": current_user["id"],
+        "p_customer_id": quotation.customer_id,
+        "p_discount_amount": quotation.discount_amount,
+        "p_tax_rate": quotation.tax_rate,
+        "p_notes": quotation.notes,
+        "p_items": [item.model_dump() for item in quotation.items]
+    }).execute()
+    if not response.data:
         raise HTTPException(status_code=500, detail="Failed to create quotation")
     
-    quotation_id = quot_response.data[0]["id"]
-    
-    # Items ekle
-    items_data = []
-    for item in quotation.items:
-        items_data.append({
-            "quotation_id": quotation_id,
-            **item.dict()
-        })
-    
-    supabase.table("quotation_items").insert(items_data).execute()
-    
-    # Customer bilgisiyle birlikte dön
-    final_response = supabase.table("quotations").select("*, customers(*)").eq("id", quotation_id).execute()
-    result = final_response.data[0]
-    items_response = supabase.table("quotation_items").select("*").eq("quotation_id", quotation_id).execute()
-    result["items"] = items_response.data
-    result["customer"] = result.pop("customers", {})
-    
-    return result
+    invalidate_dashboard(current_user["id"])
+    return response.data
 
 @api_router.get("/quotations/{quotation_id}")
 async def get_quotation(quotation_id: str, current_user: dict = Depends(get_current_user)):
-    response = supabase.table("quotations").select("*, customers(*)").eq("id", quotation_id).eq("user_id", current_user["id"]).execute()
+    response = await supabase.table("quotations").select(QUOTATION_SELECT).eq("id", quotation_id).eq("user_id", current_user["id"]).execute()
     if not response.data:
         raise HTTPException(status_code=404, detail="Quotation not found")
     
-    quotation = response.data[0]
-    items_response = supabase.table("quotation_items").select("*").eq("quotation_id", quotation_id).execute()
-    quotation["items"] = items_response.data
-    quotation["customer"] = quotation.pop("customers", {})
-    
-    return quotation
+    return response.data[0]
 
 @api_router.put("/quotations/{quotation_id}")
 async def update_quotation(quotation_id: str, quotation: QuotationCreate, current_user: dict = Depends(get_current_user)):
-    # Hesaplamalar
-    subtotal = sum(item.total for item in quotation.items)
-    taxable_amount = subtotal - quotation.discount_amount
-    tax_amount = taxable_amount * (quotation.tax_rate / 100)
-    total = taxable_amount + tax_amount
-    
-    update_data = {
-        "customer_id": quotation.customer_id,
-        "subtotal": subtotal,
-        "discount_amount": quotation.discount_amount,
-        "tax_rate": quotation.tax_rate,
-        "tax_amount": tax_amount,
-        "total": total,
-        "notes": quotation.notes
-    }
-    
-    response = supabase.table("quotations").update(update_data).eq("id", quotation_id).eq("user_id", current_user["id"]).execute()
+    # Başlık ve itemlar tek transaction'da güncellenir; toplamlar DB'de hesaplanır
+    response = await supabase.rpc("update_quotation_with_items", {
+        "p_quotation_id": quotation_id,
+        "p_user_id": current_user["id"],
+        "p_customer_id": quotation.customer_id,
+        "p_discount_amount": quotation.discount_amount,
+        "p_tax_rate": quotation.tax_rate,
+        "p_notes": quotation.notes,
+        "p_items": [item.model_dump() for item in quotation.items]
+    }).execute()
     if not response.data:
         raise HTTPException(status_code=404, detail="Quotation not found")
     
-    # Eski itemları sil
-    supabase.table("quotation_items").delete().eq("quotation_id", quotation_id).execute()
-    
-    # Yeni itemları ekle
-    items_data = []
-    for item in quotation.items:
-        items_data.append({
-            "quotation_id": quotation_id,
-            **item.dict()
-        })
-    
-    supabase.table("quotation_items").insert(items_data).execute()
-    
-    # Güncel veriyi dön
-    final_response = supabase.table("quotations").select("*, customers(*)").eq("id", quotation_id).execute()
-    result = final_response.data[0]
-    items_response = supabase.table("quotation_items").select("*").eq("quotation_id", quotation_id).execute()
-    result["items"] = items_response.data
-    result["customer"] = result.pop("customers", {})
-    
-    return result
+    invalidate_dashboard(current_user["id"])
+    return response.data
 
 @api_router.delete("/quotations/{quotation_id}")
 async def delete_quotation(quotation_id: str, current_user: dict = Depends(get_current_user)):
-    response = supabase.table("quotations").delete().eq("id", quotation_id).eq("user_id", current_user["id"]).execute()
+    response = await supabase.table("quotations").delete().eq("id", quotation_id).eq("user_id", current_user["id"]).execute()
     if not response.data:
         raise HTTPException(status_code=404, detail="Quotation not found")
+    invalidate_dashboard(current_user["id"])
     return {"message": "Quotation deleted successfully"}
 
 @api_router.put("/quotations/{quotation_id}/payment")
 async def update_payment_status(quotation_id: str, payment: PaymentUpdate, current_user: dict = Depends(get_current_user)):
-    update_data = payment.dict(exclude_unset=True)
-    response = supabase.table("quotations").update(update_data).eq("id", quotation_id).eq("user_id", current_user["id"]).execute()
+    update_data = payment.model_dump(mode="json", exclude_unset=True)
+    response = await supabase.table("quotations").update(update_data).eq("id", quotation_id).eq("user_id", current_user["id"]).execute()
     if not response.data:
         raise HTTPException(status_code=404, detail="Quotation not found")
+    invalidate_dashboard(current_user["id"])
     return response.data[0]
 
 # ============================================================
 # PDF GENERATION
 # ============================================================
 
-@api_router.get("/quotations/{quotation_id}/pdf")
-async def generate_quotation_pdf(quotation_id: str, current_user: dict = Depends(get_current_user)):
-    # Quotation verilerini çek
-    response = supabase.table("quotations").select("*, customers(*)").eq("id", quotation_id).eq("user_id", current_user["id"]).execute()
-    if not response.data:
-        raise HTTPException(status_code=404, detail="Quotation not found")
-    
-    quotation = response.data[0]
-    items_response = supabase.table("quotation_items").select("*").eq("quotation_id", quotation_id).execute()
-    quotation["items"] = items_response.data
-    customer = quotation.get("customers", {})
-    
+# Sabit PDF fontları ve tablo başlıkları (import sırasında bir kez hazırlanır)
+_PDF_TITLE_FONT = ("Helvetica-Bold", 20)
+_PDF_SECTION_FONT = ("Helvetica-Bold", 12)
+_PDF_HEADER_FONT = ("Helvetica-Bold", 10)
+_PDF_BODY_FONT = ("Helvetica", 10)
+_PDF_ITEM_FONT = ("Helvetica", 9)
+_PDF_SPEC_FONT = ("Helvetica", 8)
+_PDF_ITEM_HEADERS = (("Ürün/Hizmet", 50), ("Miktar", 250), ("Birim", 320), ("Birim Fiyat", 380))
+
+# ReportLab CPU-yoğun; PDF'ler ayrı thread pool'da oluşturulur
+_pdf_pool = ThreadPoolExecutor(max_workers=4)
+
+# Oluşturulan PDF'ler; anahtar teklif, müşteri ve firma bilgisi değişince kendiliğinden değişir
+_pdf_cache = LRUCache(maxsize=256)
+_PDF_CUSTOMER_FIELDS = ("name", "company", "address", "phone")
+_PDF_USER_FIELDS = ("company", "company_address", "phone")
+
+def build_quotation_pdf(quotation: dict, customer: dict, user: dict) -> bytes:
     # PDF oluştur
     buffer = io.BytesIO()
     pdf = canvas.Canvas(buffer, pagesize=A4)
     width, height = A4
+    right = width - 50
+    
+    # Çizimler fonta göre gruplanır, her font için setFont bir kez çağrılır
+    ops = {}
+    def text(font, x, y, value, align_right=False):
+        ops.setdefault(font, []).append((x, y, value, align_right))
     
     # Başlık
-    pdf.setFont("Helvetica-Bold", 20)
-    pdf.drawString(50, height - 50, "FİYAT TEKLİFİ")
+    text(_PDF_TITLE_FONT, 50, height - 50, "FİYAT TEKLİFİ")
     
     # Teklif Numarası ve Tarih
-    pdf.setFont("Helvetica", 10)
-    pdf.drawString(50, height - 80, f"Teklif No: {quotation.get('quotation_number', 'N/A')}")
-    pdf.drawString(50, height - 95, f"Tarih: {quotation.get('created_at', '')[:10]}")
+    text(_PDF_BODY_FONT, 50, height - 80, f"Teklif No: {quotation.get('quotation_number', 'N/A')}")
+    text(_PDF_BODY_FONT, 50, height - 95, f"Tarih: {quotation.get('created_at', '')[:10]}")
     
     # Firma Bilgileri (sol)
     y = height - 130
-    pdf.setFont("Helvetica-Bold", 12)
-    pdf.drawString(50, y, "Firma Bilgileri:")
-    pdf.setFont("Helvetica", 10)
+    text(_PDF_SECTION_FONT, 50, y, "Firma Bilgileri:")
     y -= 20
-    if current_user.get("company"):
-        pdf.drawString(50, y, current_user["company"])
-        y -= 15
-    if current_user.get("company_address"):
-        pdf.drawString(50, y, current_user["company_address"])
-        y -= 15
-    if current_user.get("phone"):
-        pdf.drawString(50, y, f"Tel: {current_user['phone']}")
-        y -= 15
+    for value in (user.get("company"), user.get("company_address")):
+        if value:
+            text(_PDF_BODY_FONT, 50, y, value)
+            y -= 15
+    if user.get("phone"):
+        text(_PDF_BODY_FONT, 50, y, f"Tel: {user['phone']}")
     
     # Müşteri Bilgileri (sağ)
     y = height - 130
-    pdf.setFont("Helvetica-Bold", 12)
-    pdf.drawRightString(width - 50, y, "Müşteri Bilgileri:")
-    pdf.setFont("Helvetica", 10)
+    text(_PDF_SECTION_FONT, right, y, "Müşteri Bilgileri:", True)
     y -= 20
-    if customer.get("name"):
-        pdf.drawRightString(width - 50, y, customer["name"])
-        y -= 15
-    if customer.get("company"):
-        pdf.drawRightString(width - 50, y, customer["company"])
-        y -= 15
-    if customer.get("address"):
-        pdf.drawRightString(width - 50, y, customer["address"])
-        y -= 15
+    for value in (customer.get("name"), customer.get("company"), customer.get("address")):
+        if value:
+            text(_PDF_BODY_FONT, right, y, value, True)
+            y -= 15
     if customer.get("phone"):
-        pdf.drawRightString(width - 50, y, f"Tel: {customer['phone']}")
+        text(_PDF_BODY_FONT, right, y, f"Tel: {customer['phone']}", True)
     
     # Tablo - Ürünler
     y = height - 280
-    pdf.setFont("Helvetica-Bold", 10)
-    pdf.drawString(50, y, "Ürün/Hizmet")
-    pdf.drawString(250, y, "Miktar")
-    pdf.drawString(320, y, "Birim")
-    pdf.drawString(380, y, "Birim Fiyat")
-    pdf.drawRightString(width - 50, y, "Toplam")
-    
-    pdf.line(50, y - 5, width - 50, y - 5)
+    for label, x in _PDF_ITEM_HEADERS:
+        text(_PDF_HEADER_FONT, x, y, label)
+    text(_PDF_HEADER_FONT, right, y, "Toplam", True)
+    
+    pdf.line(50, y - 5, right, y - 5)
     y -= 20
     
-    pdf.setFont("Helvetica", 9)
     for item in quotation["items"]:
-        pdf.drawString(50, y, item["product_name"][:40])
-        pdf.drawString(250, y, str(item["quantity"]))
-        pdf.drawString(320, y, item["unit"])
-        pdf.drawString(380, y, f"₺{item['unit_price']:.2f}")
-        pdf.drawRightString(width - 50, y, f"₺{item['total']:.2f}")
+        text(_PDF_ITEM_FONT, 50, y, item["product_name"][:40])
+        text(_PDF_ITEM_FONT, 250, y, str(item["quantity"]))
+        text(_PDF_ITEM_FONT, 320, y, item["unit"])
+        text(_PDF_ITEM_FONT, 380, y, f"₺{item['unit_price']:.2f}")
+        text(_PDF_ITEM_FONT, right, y, f"₺{item['total']:.2f}", True)
         y -= 15
         if item.get("specifications"):
-            pdf.setFont("Helvetica", 8)
-            pdf.drawString(60, y, f"  {item['specifications'][:60]}")
+            text(_PDF_SPEC_FONT, 60, y, f"  {item['specifications'][:60]}")
             y -= 12
-            pdf.setFont("Helvetica", 9)
     
     # Toplam hesaplamalar
     y -= 10
-    pdf.line(50, y, width - 50, y)
+    pdf.line(50, y, right, y)
     y -= 20
     
-    pdf.setFont("Helvetica", 10)
-    pdf.drawString(380, y, "Ara Toplam:")
-    pdf.drawRightString(width - 50, y, f"₺{quotation['subtotal']:.2f}")
+    text(_PDF_BODY_FONT, 380, y, "Ara Toplam:")
+    text(_PDF_BODY_FONT, right, y, f"₺{quotation['subtotal']:.2f}", True)
     y -= 15
     
     if quotation.get("discount_amount", 0) > 0:
-        pdf.drawString(380, y, "İndirim:")
-        pdf.drawRightString(width - 50, y, f"-₺{quotation['discount_amount']:.2f}")
+        text(_PDF_BODY_FONT, 380, y, "İndirim:")
+        text(_PDF_BODY_FONT, right, y, f"-₺{quotation['discount_amount']:.2f}", True)
         y -= 15
     
-    pdf.drawString(380, y, f"KDV ({quotation['tax_rate']}%):")
-    pdf.drawRightString(width - 50, y, f"₺{quotation['tax_amount']:.2f}")
+    text(_PDF_BODY_FONT, 380, y, f"KDV ({quotation['tax_rate']}%):")
+    text(_PDF_BODY_FONT, right, y, f"₺{quotation['tax_amount']:.2f}", True)
     y -= 15
     
-    pdf.setFont("Helvetica-Bold", 12)
-    pdf.drawString(380, y, "Genel Toplam:")
-    pdf.drawRightString(width - 50, y, f"₺{quotation['total']:.2f}")
+    text(_PDF_SECTION_FONT, 380, y, "Genel Toplam:")
+    text(_PDF_SECTION_FONT, right, y, f"₺{quotation['total']:.2f}", True)
     
     # Notlar
     if quotation.get("notes"):
         y -= 40
-        pdf.setFont("Helvetica-Bold", 10)
-        pdf.drawString(50, y, "Notlar:")
+        text(_PDF_HEADER_FONT, 50, y, "Notlar:")
         y -= 15
-        pdf.setFont("Helvetica", 9)
-        pdf.drawString(50, y, quotation["notes"][:100])
+        text(_PDF_ITEM_FONT, 50, y, quotation["notes"][:100])
+    
+    for font, entries in ops.items():
+        pdf.setFont(*font)
+        for x, y, value, align_right in entries:
+            if align_right:
+                pdf.drawRightString(x, y, value)
+            else:
+                pdf.drawString(x, y, value)
     
     pdf.showPage()
     pdf.save()
+    return buffer.getvalue()
+
+@api_router.get("/quotations/{quotation_id}/pdf")
+async def generate_quotation_pdf(quotation_id: str, request: Request, current_user: dict = Depends(get_current_user)):
+    # Önbellek anahtarı için hafif sorgu
+    probe = await supabase.table("quotations").select(
+        f"quotation_number, updated_at, customer:customers({', '.join(_PDF_CUSTOMER_FIELDS)})"
+    ).eq("id", quotation_id).eq("user_id", current_user["id"]).execute()
+    if not probe.data:
+        raise HTTPException(status_code=404, detail="Quotation not found")
+    
+    quotation_number = probe.data[0].get("quotation_number") or "N/A"
+    probe_customer = probe.data[0].get("customer") or {}
+    cache_key = (
+        quotation_id,
+        probe.data[0].get("updated_at"),
+        tuple(probe_customer.get(field) for field in _PDF_CUSTOMER_FIELDS),
+        tuple(current_user.get(field) for field in _PDF_USER_FIELDS),
+    )
+    
+    # URL teklif düzenlense de aynı kalır; tarayıcı her seferinde ETag ile doğrular
+    headers = {
+        "Content-Disposition": f"attachment; filename=teklif_{quotation_number}.pdf",
+        "ETag": make_etag(repr(cache_key).encode()),
+        "Cache-Control": "private, no-cache"
+    }
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    pdf_bytes = _pdf_cache.get(cache_key)
+    if pdf_bytes is None:
+        # Quotation verilerini çek
+        response = await supabase.table("quotations").select(QUOTATION_SELECT).eq("id", quotation_id).eq("user_id", current_user["id"]).execute()
+        if not response.data:
+            raise HTTPException(status_code=404, detail="Quotation not found")
+        
+        quotation = response.data[0]
+        customer = quotation["customer"] or {}
+        
+        # PDF'i event loop dışında oluştur
+        loop = asyncio.get_running_loop()
+        pdf_bytes = await loop.run_in_executor(_pdf_pool, build_quotation_pdf, quotation, customer, current_user)
+        _pdf_cache[cache_key] = pdf_bytes
     
-    buffer.seek(0)
-    return Response(content=buffer.getvalue(), media_type="application/pdf", headers={
-        "Content-Disposition": f"attachment; filename=teklif_{quotation.get('quotation_number', 'N/A')}.pdf"
-    })
+    return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
 
 # ============================================================
 # REMINDERS
 # ============================================================
 
+REMINDER_SELECT = "id, quotation_id, reminder_date, message, sent, created_at, quotations(quotation_number, customers(id, name, company, email, phone))"
+
 @api_router.get("/reminders")
 async def get_reminders(current_user: dict = Depends(get_current_user)):
-    response = supabase.table("reminders").select("*, quotations(quotation_number, customers(*))").eq("user_id", current_user["id"]).order("reminder_date", desc=False).execute()
+    response = await supabase.table("reminders").select(REMINDER_SELECT).eq("user_id", current_user["id"]).order("reminder_date", desc=False).execute()
     return response.data
 
 @api_router.post("/reminders")
 async def create_reminder(reminder: ReminderCreate, current_user: dict = Depends(get_current_user)):
     new_reminder = {
         "user_id": current_user["id"],
-        **reminder.dict()
+        **reminder.model_dump(mode="json")
     }
-    response = supabase.table("reminders").insert(new_reminder).execute()
+    response = await supabase.table("reminders").insert(new_reminder).execute()
     if not response.data:
         raise HTTPException(status_code=500, detail="Failed to create reminder")
     return response.data[0]
@@ -744,7 +917,7 @@ async def create_reminder(reminder: ReminderCreate, current_user: dict = Depends
 @api_router.post("/reminders/{reminder_id}/send")
 async def send_reminder(reminder_id: str, current_user: dict = Depends(get_current_user)):
     # Hatırlatıcıyı işaretle
-    response = supabase.table("reminders").update({"sent": True}).eq("id", reminder_id).eq("user_id", current_user["id"]).execute()
+    response = await supabase.table("reminders").update({"sent": True}).eq("id", reminder_id).eq("user_id", current_user["id"]).execute()
     if not response.data:
         raise HTTPException(status_code=404, detail="Reminder not found")
     
@@ -752,7 +925,7 @@ async def send_reminder(reminder_id: str, current_user: dict = Depends(get_curre
 
 @api_router.delete("/reminders/{reminder_id}")
 async def delete_reminder(reminder_id: str, current_user: dict = Depends(get_current_user)):
-    response = supabase.table("reminders").delete().eq("id", reminder_id).eq("user_id", current_user["id"]).execute()
+    response = await supabase.table("reminders").delete().eq("id", reminder_id).eq("user_id", current_user["id"]).execute()
     if not response.data:
         raise HTTPException(status_code=404, detail="Reminder not found")
     return {"message": "Reminder deleted successfully"}
@@ -761,88 +934,151 @@ async def delete_reminder(reminder_id: str, current_user: dict = Depends(get_cur
 # STATISTICS
 # ============================================================
 
-@api_router.get("/statistics")
-async def get_statistics(current_user: dict = Depends(get_current_user)):
-    # Customers count
-    customers_response = supabase.table("customers").select("id", count="exact").eq("user_id", current_user["id"]).execute()
-    total_customers = customers_response.count or 0
+class QuotationStatsBatcher:
+    """Eşzamanlı istatistik isteklerini kısa bir pencerede toplayıp tek RPC ile çeker."""
     
-    # Products count
-    products_response = supabase.table("products").select("id", count="exact").eq("user_id", current_user["id"]).execute()
-    total_products = products_response.count or 0
+    def __init__(self, window: float = 0.005):
+        self.window = window
+        self._pending = {}
+        self._flush_task = None
+        # Event loop task'lara sadece zayıf referans tutar; çalışan flush'lar burada yaşar
+        self._tasks = set()
     
-    # Quotations
-    quotations_response = supabase.table("quotations").select("*").eq("user_id", current_user["id"]).execute()
-    total_quotations = len(quotations_response.data)
+    async def load(self, user_id: str) -> dict:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(user_id, []).append(future)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush())
+            self._tasks.add(self._flush_task)
+            self._flush_task.add_done_callback(self._tasks.discard)
+        return await future
     
-    # Revenue calculations
-    total_revenue = sum(q["total"] for q in quotations_response.data if q.get("payment_status") == "paid")
-    pending_payments = sum(q["total"] for q in quotations_response.data if q.get("payment_status") == "unpaid")
+    async def _flush(self):
+        await asyncio.sleep(self.window)
+        pending, self._pending = self._pending, {}
+        self._flush_task = None
+        
+        try:
+            response = await supabase.rpc("get_user_quotation_stats_bulk", {"uids": list(pending)}).execute()
+            rows = {row["user_id"]: row for row in response.data}
+            for user_id, futures in pending.items():
+                for future in futures:
+                    if not future.done():
+                        future.set_result(rows[user_id])
+        except Exception as e:
+            # Bekleyen hiçbir istek asılı kalmasın
+            for futures in pending.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+
+_stats_batcher = QuotationStatsBatcher()
+
+async def get_quotation_stats(user_id: str) -> dict:
+    # /statistics ve /payments/statistics aynı aggregate sonucunu paylaşır
+    cache_key = (user_id, "quotation_stats")
+    stats = _dashboard_cache.get(cache_key)
+    if stats is None:
+        stats = await _stats_batcher.load(user_id)
+        _dashboard_cache[cache_key] = stats
+    return stats
+
+@api_router.get("/statistics")
+async def get_statistics(request: Request, current_user: dict = Depends(get_current_user)):
+    cache_key = (current_user["id"], "statistics")
+    cached = _dashboard_cache.get(cache_key)
+    if cached is not None:
+        return etag_response(request, cached)
     
-    return {
-        "total_customers": total_customers,
-        "total_products": total_products,
-        "total_quotations": total_quotations,
-        "total_revenue": total_revenue,
-        "pending_payments": pending_payments
+    # Birbirinden bağımsız sorgular paralel çalışır
+    customers_response, products_response, stats = await asyncio.gather(
+        supabase.table("customers").select("id", count="exact", head=True).eq("user_id", current_user["id"]).execute(),
+        supabase.table("products").select("id", count="exact", head=True).eq("user_id", current_user["id"]).execute(),
+        get_quotation_stats(current_user["id"])
+    )
+    
+    result = {
+        "total_customers": customers_response.count or 0,
+        "total_products": products_response.count or 0,
+        "total_quotations": stats["total_quotations"],
+        "total_revenue": stats["total_revenue"],
+        "pending_payments": stats["pending_payments"]
     }
+    _dashboard_cache[cache_key] = result
+    return etag_response(request, result)
 
 # ============================================================
 # PAYMENTS
 # ============================================================
 
+# Ödeme listeleri sadece ödeme ekranının gösterdiği alanları çeker
+PAYMENT_SELECT = (
+    "id, customer_id, quotation_number, total, status, payment_status, payment_date, payment_amount, "
+    "payment_notes, created_at, customer:customers(id, name, company, email, phone)"
+)
+
+@api_router.get("/payments")
+async def get_payments(current_user: dict = Depends(get_current_user)):
+    # Bekleyen ve ödenmiş teklifler tek sorguda çekilip ayrılır
+    response = await supabase.table("quotations").select(PAYMENT_SELECT).eq("user_id", current_user["id"]).in_("payment_status", ["paid", "unpaid"]).execute()
+    payments = {"pending": [], "paid": []}
+    for quot in response.data:
+        payments["paid" if quot["payment_status"] == "paid" else "pending"].append(quot)
+    return payments
+
 @api_router.get("/payments/pending")
 async def get_pending_payments(current_user: dict = Depends(get_current_user)):
-    response = supabase.table("quotations").select("*, customers(*)").eq("user_id", current_user["id"]).eq("payment_status", "unpaid").execute()
-    quotations = []
-    for quot in response.data:
-        quot["customer"] = quot.pop("customers", {})
-        quotations.append(quot)
-    return quotations
+    response = await supabase.table("quotations").select(PAYMENT_SELECT).eq("user_id", current_user["id"]).eq("payment_status", "unpaid").execute()
+    return response.data
 
 @api_router.get("/payments/paid")
 async def get_paid_payments(current_user: dict = Depends(get_current_user)):
-    response = supabase.table("quotations").select("*, customers(*)").eq("user_id", current_user["id"]).eq("payment_status", "paid").execute()
-    quotations = []
-    for quot in response.data:
-        quot["customer"] = quot.pop("customers", {})
-        quotations.append(quot)
-    return quotations
+    response = await supabase.table("quotations").select(PAYMENT_SELECT).eq("user_id", current_user["id"]).eq("payment_status", "paid").execute()
+    return response.data
 
 @api_router.get("/payments/statistics")
-async def get_payment_statistics(current_user: dict = Depends(get_current_user)):
-    quotations_response = supabase.table("quotations").select("*").eq("user_id", current_user["id"]).execute()
+async def get_payment_statistics(request: Request, current_user: dict = Depends(get_current_user)):
+    cache_key = (current_user["id"], "payment_statistics")
+    cached = _dashboard_cache.get(cache_key)
+    if cached is not None:
+        return etag_response(request, cached)
     
-    total_expected = sum(q["total"] for q in quotations_response.data)
-    total_received = sum(q.get("payment_amount", 0) or q["total"] for q in quotations_response.data if q.get("payment_status") == "paid")
-    total_pending = sum(q["total"] for q in quotations_response.data if q.get("payment_status") == "unpaid")
-    overdue_count = sum(1 for q in quotations_response.data if q.get("payment_status") == "unpaid")
+    stats = await get_quotation_stats(current_user["id"])
     
-    return {
-        "total_expected": total_expected,
-        "total_received": total_received,
-        "total_pending": total_pending,
-        "overdue_count": overdue_count
+    result = {
+        "total_expected": stats["total_expected"],
+        "total_received": stats["total_received"],
+        "total_pending": stats["pending_payments"],
+        "overdue_count": stats["overdue_count"]
     }
+    _dashboard_cache[cache_key] = result
+    return etag_response(request, result)
 
 # ============================================================
 # CATALOG / CATEGORIES
 # ============================================================
 
 @api_router.get("/catalog/categories")
-async def get_categories(current_user: dict = Depends(get_current_user)):
-    # Kullanıcının ürünlerinden benzersiz kategorileri çek
-    response = supabase.table("products").select("category").eq("user_id", current_user["id"]).execute()
-    categories = list(set(p["category"] for p in response.data if p.get("category")))
-    return {"categories": sorted(categories)}
+async def get_categories(request: Request, current_user: dict = Depends(get_current_user)):
+    cache_key = (current_user["id"], "categories")
+    cached = _dashboard_cache.get(cache_key)
+    if cached is not None:
+        return etag_response(request, cached)
+    
+    # Kullanıcının ürünlerinden benzersiz kategoriler (DISTINCT DB'de)
+    response = await supabase.rpc("get_user_categories", {"uid": current_user["id"]}).execute()
+    result = {"categories": [row["category"] for row in response.data]}
+    _dashboard_cache[cache_key] = result
+    return etag_response(request, result)
 
 @api_router.post("/catalog/categories")
-async def create_category(category_name: str, current_user: dict = Depends(get_current_user)):
+async def create_category(category: CategoryCreate, current_user: dict = Depends(get_current_user)):
     new_category = {
         "user_id": current_user["id"],
-        "name": category_name
+        "name": category.name
     }
-    response = supabase.table("catalog_categories").insert(new_category).execute()
+    # Aynı isim tekrar gönderilirse mevcut kayıt döner
+    response = await supabase.table("catalog_categories").upsert(new_category, on_conflict="user_id,name").execute()
     if not response.data:
         raise HTTPException(status_code=500, detail="Failed to create category")
     return response.data[0]
@@ -857,14 +1093,24 @@ app.include_router(api_router)
 async def root():
     return {"message": "Invoice & Quotation API with Supabase is running!"}
 
+# Health sonucu kısa süre önbellekte tutulur; sık polling veritabanına yansımaz
+HEALTH_CACHE_SECONDS = 5
+_health = {"checked_at": 0.0, "result": None}
+
 @app.get("/health")
 async def health_check():
+    if _health["result"] is not None and time.monotonic() - _health["checked_at"] < HEALTH_CACHE_SECONDS:
+        return _health["result"]
+    
     try:
         # Supabase bağlantı testi
-        supabase.table("users").select("id").limit(1).execute()
-        return {"status": "healthy", "database": "connected"}
+        await supabase.table("users").select("id").limit(1).execute()
+        result = {"status": "healthy", "database": "connected"}
     except Exception as e:
-        return {"status": "unhealthy", "error": str(e)}
+        result = {"status": "unhealthy", "error": str(e)}
+    
+    _health.update(checked_at=time.monotonic(), result=result)
+    return result
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,40 @@
+-- Teklif ve kalemlerini tek transaction içinde oluşturur, müşteri ve kalemlerle birlikte döner
+create or replace function public.create_quotation_with_items(
+    p_user_id uuid,
+    p_customer_id uuid,
+    p_quotation_number text,
+    p_subtotal numeric,
+    p_discount_amount numeric,
+    p_tax_rate integer,
+    p_tax_amount numeric,
+    p_total numeric,
+    p_notes text,
+    p_items jsonb
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_quotation quotations;
+begin
+    insert into quotations (user_id, customer_id, quotation_number, subtotal, discount_amount,
+                            tax_rate, tax_amount, total, notes, status, payment_status)
+    values (p_user_id, p_customer_id, p_quotation_number, p_subtotal, p_discount_amount,
+            p_tax_rate, p_tax_amount, p_total, p_notes, 'pending', 'unpaid')
+    returning * into v_quotation;
+
+    insert into quotation_items (quotation_id, product_name, specifications, quantity, unit, unit_price, total)
+    select v_quotation.id, i.product_name, i.specifications, i.quantity, i.unit, i.unit_price, i.total
+    from jsonb_to_recordset(p_items) as i(product_name text, specifications text, quantity integer,
+                                          unit text, unit_price numeric, total numeric);
+
+    return to_jsonb(v_quotation) || jsonb_build_object(
+        'customer', coalesce((select to_jsonb(c) from customers c where c.id = v_quotation.customer_id), '{}'::jsonb),
+        'items', coalesce((select jsonb_agg(to_jsonb(qi)) from quotation_items qi where qi.quotation_id = v_quotation.id), '[]'::jsonb)
+    );
+end;
+$$;
+
+-- Sadece backend (service role) çağırabilir
+revoke execute on function public.create_quotation_with_items(uuid, uuid, text, numeric, numeric, integer, numeric, numeric, text, jsonb) from public, anon, authenticated;
+grant execute on function public.create_quotation_with_items(uuid, uuid, text, numeric, numeric, integer, numeric, numeric, text, jsonb) to service_role;
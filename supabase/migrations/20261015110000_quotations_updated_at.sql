@@ -0,0 +1,35 @@
+-- Teklif veya kalemleri değiştiğinde updated_at güncellenir (PDF önbellek anahtarı)
+alter table public.quotations
+    add column if not exists updated_at timestamptz not null default now();
+
+create or replace function public.set_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := now();
+    return new;
+end;
+$$;
+
+drop trigger if exists quotations_set_updated_at on public.quotations;
+create trigger quotations_set_updated_at
+    before update on public.quotations
+    for each row execute function public.set_updated_at();
+
+create or replace function public.touch_quotation_from_items()
+returns trigger
+language plpgsql
+as $$
+begin
+    update public.quotations
+    set updated_at = now()
+    where id = coalesce(new.quotation_id, old.quotation_id);
+    return null;
+end;
+$$;
+
+drop trigger if exists quotation_items_touch_quotation on public.quotation_items;
+create trigger quotation_items_touch_quotation
+    after insert or update or delete on public.quotation_items
+    for each row execute function public.touch_quotation_from_items();
@@ -0,0 +1,116 @@
+-- Teklif toplamları veritabanında hesaplanır: subtotal kalemlerden, tax_amount ve total ise
+-- BEFORE trigger ile. İstemcinin gönderdiği değerler ezilir; böylece tax_amount/total yazan
+-- eski sürüm deploy süresince çalışmaya devam eder (generated column bu yazmaları reddederdi).
+alter table public.quotations
+    alter column subtotal set default 0,
+    alter column discount_amount set default 0;
+
+-- Daha önce generated column olarak uygulanmış ortamlar için normal kolona döndürür
+alter table public.quotations
+    alter column tax_amount drop expression if exists,
+    alter column total drop expression if exists;
+
+create or replace function public.compute_quotation_totals()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.tax_amount := (new.subtotal - new.discount_amount) * new.tax_rate / 100.0;
+    new.total := (new.subtotal - new.discount_amount) * (1 + new.tax_rate / 100.0);
+    return new;
+end;
+$$;
+
+drop trigger if exists quotations_compute_totals on public.quotations;
+create trigger quotations_compute_totals
+    before insert or update on public.quotations
+    for each row execute function public.compute_quotation_totals();
+
+-- Statement seviyesinde çalışır: etkilenen her teklif, satır sayısından bağımsız olarak bir kez güncellenir
+create or replace function public.refresh_quotation_from_items()
+returns trigger
+language plpgsql
+as $$
+declare
+    v_quotation_ids uuid[];
+begin
+    -- Transition tabloları sadece tanımlandıkları işlemde erişilebilir
+    if tg_op = 'INSERT' then
+        select array_agg(distinct quotation_id) into v_quotation_ids from new_items;
+    elsif tg_op = 'DELETE' then
+        select array_agg(distinct quotation_id) into v_quotation_ids from old_items;
+    else
+        select array_agg(distinct quotation_id) into v_quotation_ids
+        from (select quotation_id from new_items union select quotation_id from old_items) changed;
+    end if;
+
+    update public.quotations q
+    set subtotal = coalesce((select sum(qi.total) from public.quotation_items qi where qi.quotation_id = q.id), 0),
+        updated_at = now()
+    where q.id = any(v_quotation_ids);
+    return null;
+end;
+$$;
+
+drop trigger if exists quotation_items_touch_quotation on public.quotation_items;
+drop function if exists public.touch_quotation_from_items();
+drop trigger if exists quotation_items_refresh_quotation on public.quotation_items;
+
+-- Transition tablolu trigger'lar tek olay kabul ettiği için her işlem ayrı tanımlanır
+drop trigger if exists quotation_items_refresh_quotation_insert on public.quotation_items;
+create trigger quotation_items_refresh_quotation_insert
+    after insert on public.quotation_items
+    referencing new table as new_items
+    for each statement execute function public.refresh_quotation_from_items();
+
+drop trigger if exists quotation_items_refresh_quotation_update on public.quotation_items;
+create trigger quotation_items_refresh_quotation_update
+    after update on public.quotation_items
+    referencing old table as old_items new table as new_items
+    for each statement execute function public.refresh_quotation_from_items();
+
+drop trigger if exists quotation_items_refresh_quotation_delete on public.quotation_items;
+create trigger quotation_items_refresh_quotation_delete
+    after delete on public.quotation_items
+    referencing old table as old_items
+    for each statement execute function public.refresh_quotation_from_items();
+
+drop function if exists public.create_quotation_with_items(uuid, uuid, numeric, numeric, integer, numeric, numeric, text, jsonb);
+
+create or replace function public.create_quotation_with_items(
+    p_user_id uuid,
+    p_customer_id uuid,
+    p_discount_amount numeric,
+    p_tax_rate integer,
+    p_notes text,
+    p_items jsonb
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_quotation_id uuid;
+begin
+    insert into quotations (user_id, customer_id, discount_amount, tax_rate, notes, status, payment_status)
+    values (p_user_id, p_customer_id, p_discount_amount, p_tax_rate, p_notes, 'pending', 'unpaid')
+    returning id into v_quotation_id;
+
+    insert into quotation_items (quotation_id, product_name, specifications, quantity, unit, unit_price, total)
+    select v_quotation_id, i.product_name, i.specifications, i.quantity, i.unit, i.unit_price, i.total
+    from jsonb_to_recordset(p_items) as i(product_name text, specifications text, quantity integer,
+                                          unit text, unit_price numeric, total numeric);
+
+    -- Toplamlar trigger'lar çalıştıktan sonra okunur
+    return (
+        select to_jsonb(q) || jsonb_build_object(
+            'customer', coalesce((select to_jsonb(c) from customers c where c.id = q.customer_id), '{}'::jsonb),
+            'items', coalesce((select jsonb_agg(to_jsonb(qi)) from quotation_items qi where qi.quotation_id = q.id), '[]'::jsonb)
+        )
+        from quotations q
+        where q.id = v_quotation_id
+    );
+end;
+$$;
+
+revoke execute on function public.create_quotation_with_items(uuid, uuid, numeric, integer, text, jsonb) from public, anon, authenticated;
+grant execute on function public.create_quotation_with_items(uuid, uuid, numeric, integer, text, jsonb) to service_role;
@@ -0,0 +1,7 @@
+-- Her endpoint user_id ile filtreler; tenant başına index taraması için
+-- CONCURRENTLY transaction içinde reddedildiği için düz CREATE INDEX; index oluşurken tabloya yazmalar bekler
+create index if not exists idx_customers_user on public.customers (user_id);
+create index if not exists idx_products_user on public.products (user_id);
+create index if not exists idx_quotations_user_created on public.quotations (user_id, created_at desc);
+create index if not exists idx_qitems_quot on public.quotation_items (quotation_id);
+create index if not exists idx_reminders_user_date on public.reminders (user_id, reminder_date);
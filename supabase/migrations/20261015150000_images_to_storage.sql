@@ -0,0 +1,8 @@
+-- Logo ve ürün görselleri Storage'da tutulur, satırda sadece public URL kalır
+alter table public.users add column if not exists logo_url text;
+alter table public.products add column if not exists image_url text;
+
+insert into storage.buckets (id, name, public)
+values ('logos', 'logos', true),
+       ('product-images', 'product-images', true)
+on conflict (id) do nothing;
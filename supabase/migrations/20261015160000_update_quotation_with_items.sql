@@ -0,0 +1,126 @@
+-- Teklifi customer ve kalemleriyle birlikte jsonb olarak döner.
+-- Alanlar server.py'deki QUOTATION_COLUMNS / CUSTOMER_COLUMNS / QUOTATION_ITEM_COLUMNS ile aynıdır,
+-- böylece POST/PUT yanıtı GET /quotations ile aynı şekildedir.
+create or replace function public.quotation_json(p_quotation_id uuid)
+returns jsonb
+language sql
+stable
+as $$
+    select jsonb_build_object(
+        'id', q.id,
+        'customer_id', q.customer_id,
+        'quotation_number', q.quotation_number,
+        'subtotal', q.subtotal,
+        'discount_amount', q.discount_amount,
+        'tax_rate', q.tax_rate,
+        'tax_amount', q.tax_amount,
+        'total', q.total,
+        'notes', q.notes,
+        'status', q.status,
+        'payment_status', q.payment_status,
+        'payment_date', q.payment_date,
+        'payment_amount', q.payment_amount,
+        'payment_notes', q.payment_notes,
+        'created_at', q.created_at,
+        'updated_at', q.updated_at,
+        'customer', (
+            select jsonb_build_object(
+                'id', c.id,
+                'name', c.name,
+                'email', c.email,
+                'phone', c.phone,
+                'company', c.company,
+                'address', c.address,
+                'tax_number', c.tax_number,
+                'tax_office', c.tax_office,
+                'notes', c.notes,
+                'created_at', c.created_at
+            )
+            from customers c
+            where c.id = q.customer_id
+        ),
+        'items', coalesce((
+            select jsonb_agg(jsonb_build_object(
+                'id', qi.id,
+                'product_name', qi.product_name,
+                'specifications', qi.specifications,
+                'quantity', qi.quantity,
+                'unit', qi.unit,
+                'unit_price', qi.unit_price,
+                'total', qi.total
+            ))
+            from quotation_items qi
+            where qi.quotation_id = q.id
+        ), '[]'::jsonb)
+    )
+    from quotations q
+    where q.id = p_quotation_id;
+$$;
+
+create or replace function public.create_quotation_with_items(
+    p_user_id uuid,
+    p_customer_id uuid,
+    p_discount_amount numeric,
+    p_tax_rate integer,
+    p_notes text,
+    p_items jsonb
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_quotation_id uuid;
+begin
+    insert into quotations (user_id, customer_id, discount_amount, tax_rate, notes, status, payment_status)
+    values (p_user_id, p_customer_id, p_discount_amount, p_tax_rate, p_notes, 'pending', 'unpaid')
+    returning id into v_quotation_id;
+
+    insert into quotation_items (quotation_id, product_name, specifications, quantity, unit, unit_price, total)
+    select v_quotation_id, i.product_name, i.specifications, i.quantity, i.unit, i.unit_price, i.total
+    from jsonb_to_recordset(p_items) as i(product_name text, specifications text, quantity integer,
+                                          unit text, unit_price numeric, total numeric);
+
+    return public.quotation_json(v_quotation_id);
+end;
+$$;
+
+-- Teklif başlığı ve kalemleri tek transaction içinde değişir; teklif kullanıcıya ait değilse null döner
+create or replace function public.update_quotation_with_items(
+    p_quotation_id uuid,
+    p_user_id uuid,
+    p_customer_id uuid,
+    p_discount_amount numeric,
+    p_tax_rate integer,
+    p_notes text,
+    p_items jsonb
+)
+returns jsonb
+language plpgsql
+as $$
+begin
+    update quotations
+    set customer_id = p_customer_id,
+        discount_amount = p_discount_amount,
+        tax_rate = p_tax_rate,
+        notes = p_notes
+    where id = p_quotation_id and user_id = p_user_id;
+
+    if not found then
+        return null;
+    end if;
+
+    delete from quotation_items where quotation_id = p_quotation_id;
+
+    insert into quotation_items (quotation_id, product_name, specifications, quantity, unit, unit_price, total)
+    select p_quotation_id, i.product_name, i.specifications, i.quantity, i.unit, i.unit_price, i.total
+    from jsonb_to_recordset(p_items) as i(product_name text, specifications text, quantity integer,
+                                          unit text, unit_price numeric, total numeric);
+
+    return public.quotation_json(p_quotation_id);
+end;
+$$;
+
+revoke execute on function public.quotation_json(uuid) from public, anon, authenticated;
+revoke execute on function public.update_quotation_with_items(uuid, uuid, uuid, numeric, integer, text, jsonb) from public, anon, authenticated;
+grant execute on function public.quotation_json(uuid) to service_role;
+grant execute on function public.update_quotation_with_items(uuid, uuid, uuid, numeric, integer, text, jsonb) to service_role;
@@ -0,0 +1,26 @@
+-- Dashboard ve ödeme istatistikleri tek aggregate sorguda hesaplanır
+create or replace function public.get_user_quotation_stats(uid uuid)
+returns table (
+    total_quotations bigint,
+    total_revenue numeric,
+    pending_payments numeric,
+    overdue_count bigint,
+    total_expected numeric,
+    total_received numeric
+)
+language sql
+stable
+as $$
+    select
+        count(*),
+        coalesce(sum(total) filter (where payment_status = 'paid'), 0),
+        coalesce(sum(total) filter (where payment_status = 'unpaid'), 0),
+        count(*) filter (where payment_status = 'unpaid'),
+        coalesce(sum(total), 0),
+        coalesce(sum(coalesce(nullif(payment_amount, 0), total)) filter (where payment_status = 'paid'), 0)
+    from public.quotations
+    where user_id = uid;
+$$;
+
+revoke execute on function public.get_user_quotation_stats(uuid) from public, anon, authenticated;
+grant execute on function public.get_user_quotation_stats(uuid) to service_role;
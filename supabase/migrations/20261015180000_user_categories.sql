@@ -0,0 +1,14 @@
+-- Kullanıcının ürün kategorileri (benzersiz, sıralı)
+create or replace function public.get_user_categories(uid uuid)
+returns table (category text)
+language sql
+stable
+as $$
+    select distinct p.category
+    from public.products p
+    where p.user_id = uid and p.category is not null and p.category <> ''
+    order by p.category;
+$$;
+
+revoke execute on function public.get_user_categories(uuid) from public, anon, authenticated;
+grant execute on function public.get_user_categories(uuid) to service_role;
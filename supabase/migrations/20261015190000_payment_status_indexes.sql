@@ -0,0 +1,10 @@
+-- Ödeme durumu filtreleri ve istatistik aggregate'i için index-only scan
+-- Migration dosyaları transaction içinde çalıştığından CONCURRENTLY kullanılamaz (kilit etkisi: RAILWAY_DEPLOY.md)
+create index if not exists quotations_user_status_idx
+    on public.quotations (user_id, payment_status) include (total, payment_amount);
+
+-- Kategori DISTINCT sorgusu için; user_id öneki idx_products_user'ı da karşılar
+create index if not exists products_user_category_idx
+    on public.products (user_id, category);
+
+drop index if exists public.idx_products_user;
@@ -0,0 +1,29 @@
+-- Birden fazla kullanıcının teklif istatistikleri tek sorguda (eşzamanlı dashboard istekleri için)
+create or replace function public.get_user_quotation_stats_bulk(uids uuid[])
+returns table (
+    user_id uuid,
+    total_quotations bigint,
+    total_revenue numeric,
+    pending_payments numeric,
+    overdue_count bigint,
+    total_expected numeric,
+    total_received numeric
+)
+language sql
+stable
+as $$
+    select
+        u.uid,
+        count(q.id),
+        coalesce(sum(q.total) filter (where q.payment_status = 'paid'), 0),
+        coalesce(sum(q.total) filter (where q.payment_status = 'unpaid'), 0),
+        count(q.id) filter (where q.payment_status = 'unpaid'),
+        coalesce(sum(q.total), 0),
+        coalesce(sum(coalesce(nullif(q.payment_amount, 0), q.total)) filter (where q.payment_status = 'paid'), 0)
+    from unnest(uids) as u(uid)
+    left join public.quotations q on q.user_id = u.uid
+    group by u.uid;
+$$;
+
+revoke execute on function public.get_user_quotation_stats_bulk(uuid[]) from public, anon, authenticated;
+grant execute on function public.get_user_quotation_stats_bulk(uuid[]) to service_role;
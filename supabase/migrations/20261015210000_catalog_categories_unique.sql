@@ -0,0 +1,19 @@
+-- Kategori oluşturma upsert ile idempotent; önce mevcut tekrarlar temizlenir
+delete from public.catalog_categories a
+using public.catalog_categories b
+where a.user_id = b.user_id
+  and a.name = b.name
+  and a.ctid > b.ctid;
+
+do $$
+begin
+    if not exists (
+        select 1 from pg_constraint
+        where conname = 'catalog_categories_user_name_key'
+          and conrelid = 'public.catalog_categories'::regclass
+    ) then
+        alter table public.catalog_categories
+            add constraint catalog_categories_user_name_key unique (user_id, name);
+    end if;
+end;
+$$;
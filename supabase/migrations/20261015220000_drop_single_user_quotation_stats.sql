@@ -0,0 +1,3 @@
+-- Tekil sürümün yerini get_user_quotation_stats_bulk aldı.
+-- Eski sürümdeki worker'lar deploy sırasında hâlâ çağırabileceği için yeni sürüm yayına alındıktan sonra uygulanır.
+drop function if exists public.get_user_quotation_stats(uuid);